@@ -9,11 +9,17 @@ A web-based interface for the Rate Comparison Analysis tool that:
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import sys
 from datetime import date, datetime
 from typing import Dict, List, Any, Optional
 import logging
+import gzip
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain
 from io import StringIO, BytesIO
 from dotenv import load_dotenv
 
@@ -75,6 +81,51 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# StorTrack charge per store per day of historical data fetched in Step 8
+API_COST_PER_DAY = 12.50
+
+# Competitor fields shown in the Step 2 table, mapped to their display headers
+COMPETITOR_TABLE_COLUMNS = {
+    'storename': 'Store Name',
+    'address': 'Address',
+    'city': 'City',
+    'state': 'State',
+    'zip': 'ZIP',
+    'distance': 'Distance (mi)',
+    'storeid': 'Store ID',
+}
+
+# CSV #1 columns as (header, record field, default when the field is missing)
+CSV1_COLUMNS = (
+    ('Store Name', 'store_name', ''),
+    ('Store ID', 'store_id', ''),
+    ('Address', 'address', ''),
+    ('City', 'city', ''),
+    ('State', 'state', ''),
+    ('ZIP', 'zip', ''),
+    ('Distance (mi)', 'distance', ''),
+    ('Size', 'size', ''),
+    ('Feature Code', 'feature_code', ''),
+    ('Regular Rate', 'regular_rate', ''),
+    ('Online Rate', 'online_rate', ''),
+    ('Date Collected', 'date_collected', ''),
+    ('Climate Controlled', 'climate_controlled', False),
+    ('Drive Up', 'drive_up', False),
+    ('Promo', 'promo', ''),
+)
+
+# CSV #1 columns holding numbers, typed as such in the Step 10 preview
+CSV1_NUMERIC_COLUMNS = ('Distance (mi)', 'Regular Rate', 'Online Rate')
+
+# CSV #1 flag columns
+CSV1_BOOLEAN_COLUMNS = ('Climate Controlled', 'Drive Up')
+
+# CSV downloads larger than this are sent gzip-compressed
+GZIP_DOWNLOAD_THRESHOLD_BYTES = 5 * 1024 * 1024
+
+# Number of CSV #1 rows rendered in the Step 10 table
+CSV1_PREVIEW_ROWS = 200
+
 # Initialize session state
 def init_session_state():
     """Initialize all session state variables."""
@@ -94,6 +145,7 @@ def init_session_state():
         'final_records': [],
         'output_csv1': None,
         'output_csv2': None,
+        'record_counts': None,
     }
     
     for key, value in defaults.items():
@@ -123,6 +175,15 @@ def get_api_client():
         timeout=60
     )
 
+def get_api_worker_count() -> int:
+    """Get the number of concurrent StorTrack API requests allowed in Step 8."""
+    value = os.getenv('STORTRACK_API_WORKERS', '1')
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logging.warning(f"Invalid STORTRACK_API_WORKERS value {value!r}; fetching sequentially")
+        return 1
+
 @st.cache_resource
 def get_db_manager():
     """Get cached database manager."""
@@ -222,6 +283,22 @@ def step1_search_subject_store():
             st.rerun()
 
 
+@st.cache_data(show_spinner=False)
+def build_competitor_report(subject_id: int, comp_ids: tuple, _subject: Dict, _competitors: List[Dict]) -> str:
+    """Format the competitor report; cached on the subject and competitor store IDs."""
+    return format_competitor_report(_subject, _competitors)
+
+
+@st.cache_data(show_spinner=False)
+def build_competitor_df(subject_id: int, comp_ids: tuple, _competitors: List[Dict]) -> pd.DataFrame:
+    """Build the competitor table; cached on the subject and competitor store IDs."""
+    return (
+        pd.DataFrame(_competitors, columns=list(COMPETITOR_TABLE_COLUMNS))
+        .rename(columns=COMPETITOR_TABLE_COLUMNS)
+        .fillna('N/A')
+    )
+
+
 def step2_find_competitors():
     """Step 2: Find competitors around subject store."""
     render_step_header(
@@ -281,26 +358,20 @@ def step2_find_competitors():
     if st.session_state.get('show_competitor_report') and st.session_state.competitors:
         st.markdown("### Competitor Report")
         
+        comp_ids = tuple(c.get('storeid') for c in st.session_state.competitors)
+        
         # Format and display the report
-        report = format_competitor_report(st.session_state.subject_store, st.session_state.competitors)
+        report = build_competitor_report(
+            subject.get('storeid'),
+            comp_ids,
+            st.session_state.subject_store,
+            st.session_state.competitors
+        )
         st.text(report)
         
         # Create DataFrame for better visualization
-        comp_df_data = []
-        for comp in st.session_state.competitors:
-            comp_df_data.append({
-                'Store Name': comp.get('storename', 'N/A'),
-                'Address': comp.get('address', 'N/A'),
-                'City': comp.get('city', 'N/A'),
-                'State': comp.get('state', 'N/A'),
-                'ZIP': comp.get('zip', 'N/A'),
-                'Distance (mi)': comp.get('distance', 'N/A'),
-                'Store ID': comp.get('storeid', 'N/A'),
-            })
-        
-        if comp_df_data:
-            df = pd.DataFrame(comp_df_data)
-            st.dataframe(df, use_container_width=True)
+        df = build_competitor_df(subject.get('storeid'), comp_ids, st.session_state.competitors)
+        st.dataframe(df, use_container_width=True)
         
         if st.button("▶️ Continue to Rate Analysis", use_container_width=True):
             st.session_state.step = 3
@@ -434,33 +505,46 @@ def step5_store_rankings():
         ("Security", "Security features and perception"),
         ("Technology", "Website, online booking, and tech features"),
     ]
+    category_names = [category for category, _ in categories]
     
-    rankings = {}
+    # One editable stores x categories grid instead of a selectbox per cell
+    default_rankings = pd.DataFrame(
+        3,  # Default to 3
+        index=[store.get('storeid') for store in st.session_state.selected_stores],
+        columns=category_names
+    )
+    default_rankings.insert(
+        0, 'Store', [store.get('storename', 'Unknown') for store in st.session_state.selected_stores]
+    )
     
-    for store in st.session_state.selected_stores:
-        store_id = store.get('storeid')
-        store_name = store.get('storename', 'Unknown')
-        
-        st.markdown(f"#### {store_name}")
-        
-        rankings[store_id] = {}
-        
-        cols = st.columns(4)
-        for idx, (category, description) in enumerate(categories):
-            with cols[idx % 4]:
-                rank = st.selectbox(
-                    category,
-                    options=[1, 2, 3, 4, 5],
-                    index=2,  # Default to 3
-                    key=f"rank_{store_id}_{category}",
-                    help=description
-                )
-                rankings[store_id][category] = rank
-        
-        st.divider()
+    column_config = {
+        category: st.column_config.NumberColumn(
+            category,
+            help=description,
+            min_value=1,
+            max_value=5,
+            step=1,
+            required=True
+        )
+        for category, description in categories
+    }
+    
+    ranking_table = st.data_editor(
+        default_rankings,
+        column_config=column_config,
+        disabled=['Store'],
+        hide_index=True,
+        use_container_width=True,
+        key="ranking_editor"
+    )
     
     if st.button("✅ Continue", use_container_width=True):
-        st.session_state.rankings = rankings
+        ranking_rows = ranking_table[category_names].astype(int).to_dict('records')
+        
+        st.session_state.rankings = {
+            store.get('storeid'): ranks
+            for store, ranks in zip(st.session_state.selected_stores, ranking_rows)
+        }
         st.session_state.step = 6
         st.rerun()
 
@@ -544,6 +628,20 @@ def step7_custom_names():
         st.rerun()
 
 
+@st.cache_data(show_spinner=False)
+def build_gap_df(gap_rows: tuple) -> pd.DataFrame:
+    """Build the gap analysis table from (store name, store ID, missing days) rows."""
+    return pd.DataFrame([
+        {
+            'Store': store_name,
+            'Store ID': store_id,
+            'Missing Days': missing_days,
+            'Coverage %': f"{((365 - missing_days) / 365 * 100):.1f}%"
+        }
+        for store_name, store_id, missing_days in gap_rows
+    ])
+
+
 def step8_fetch_data():
     """Step 8: Fetch rate data from database and API."""
     render_step_header(
@@ -581,91 +679,113 @@ def step8_fetch_data():
         with st.spinner("Analyzing data gaps..."):
             gaps_by_store = analyze_date_gaps(dates_by_store, from_date, to_date)
             st.session_state.gaps_by_store = gaps_by_store
+            
+            # Aggregate once so the reruns triggered by the widgets below are O(1) lookups
+            st.session_state.gap_counts = {
+                store_id: len(gaps_by_store.get(store_id, [])) for store_id in selected_ids
+            }
+            st.session_state.gap_costs = {
+                store_id: missing_days * API_COST_PER_DAY
+                for store_id, missing_days in st.session_state.gap_counts.items()
+            }
+    
+    # Gap analysis stays on screen across reruns until a new fetch replaces it
+    if 'gap_counts' not in st.session_state:
+        return
+    
+    gaps_by_store = st.session_state.gaps_by_store
+    gap_counts = st.session_state.gap_counts
+    gap_costs = st.session_state.gap_costs
+    
+    # Display gap analysis
+    st.markdown("### Data Gap Analysis")
+    
+    gap_rows = []
+    for store in st.session_state.selected_stores:
+        store_id = store.get('storeid')
+        store_name = st.session_state.name_mapping.get(store_id, store.get('storename', 'Unknown'))
+        gap_rows.append((store_name, store_id, gap_counts.get(store_id, 0)))
+    
+    gap_rows = tuple(gap_rows)
+    total_missing_days = sum(gap_counts.values())
+    
+    gap_df = build_gap_df(gap_rows)
+    st.dataframe(gap_df, use_container_width=True)
+    
+    # API fetch option
+    if total_missing_days > 0:
+        st.markdown("### API Data Fetch")
+        st.warning(f"⚠️ Total missing days across all stores: {total_missing_days}")
         
-        # Display gap analysis
-        st.markdown("### Data Gap Analysis")
-        
-        gap_data = []
-        total_missing_days = 0
+        estimated_cost = sum(gap_costs.values())
+        st.info(f"💰 Estimated API cost: ${estimated_cost:,.2f} ({total_missing_days} days × ${API_COST_PER_DAY:,.2f}/day)")
         
-        for store in st.session_state.selected_stores:
-            store_id = store.get('storeid')
-            store_name = st.session_state.name_mapping.get(store_id, store.get('storename', 'Unknown'))
-            missing_dates = gaps_by_store.get(store_id, [])
-            
-            gap_data.append({
-                'Store': store_name,
-                'Store ID': store_id,
-                'Missing Days': len(missing_dates),
-                'Coverage %': f"{((365 - len(missing_dates)) / 365 * 100):.1f}%"
-            })
-            
-            total_missing_days += len(missing_dates)
+        fetch_option = st.radio(
+            "Would you like to fetch missing data from the API?",
+            ["No - Use database data only", "Yes - Fetch all missing data", "Select specific stores"],
+            key="api_fetch_option"
+        )
         
-        gap_df = pd.DataFrame(gap_data)
-        st.dataframe(gap_df, use_container_width=True)
+        if fetch_option == "Yes - Fetch all missing data":
+            if st.button(f"💳 Confirm API Fetch (${estimated_cost:,.2f})", use_container_width=True):
+                fetch_api_data(selected_ids, gaps_by_store, from_date, to_date)
+                st.session_state.step = 9
+                st.rerun()
         
-        # API fetch option
-        if total_missing_days > 0:
-            st.markdown("### API Data Fetch")
-            st.warning(f"⚠️ Total missing days across all stores: {total_missing_days}")
-            
-            estimated_cost = total_missing_days * 12.50
-            st.info(f"💰 Estimated API cost: ${estimated_cost:,.2f} ({total_missing_days} days × $12.50/day)")
+        elif fetch_option == "Select specific stores":
+            st.markdown("#### Select Stores for API Fetch")
             
-            fetch_option = st.radio(
-                "Would you like to fetch missing data from the API?",
-                ["No - Use database data only", "Yes - Fetch all missing data", "Select specific stores"],
-                key="api_fetch_option"
-            )
-            
-            if fetch_option == "Yes - Fetch all missing data":
-                if st.button(f"💳 Confirm API Fetch (${estimated_cost:,.2f})", use_container_width=True):
-                    fetch_api_data(selected_ids, gaps_by_store, from_date, to_date)
-                    st.session_state.step = 9
-                    st.rerun()
-            
-            elif fetch_option == "Select specific stores":
-                st.markdown("#### Select Stores for API Fetch")
-                
-                api_store_ids = []
-                for store in st.session_state.selected_stores:
-                    store_id = store.get('storeid')
-                    store_name = st.session_state.name_mapping.get(store_id, store.get('storename', 'Unknown'))
-                    missing_days = len(gaps_by_store.get(store_id, []))
-                    
-                    if missing_days > 0:
-                        if st.checkbox(
-                            f"{store_name} - {missing_days} missing days (${missing_days * 12.50:,.2f})",
-                            key=f"api_select_{store_id}"
-                        ):
-                            api_store_ids.append(store_id)
+            api_store_ids = []
+            for store in st.session_state.selected_stores:
+                store_id = store.get('storeid')
+                store_name = st.session_state.name_mapping.get(store_id, store.get('storename', 'Unknown'))
+                missing_days = gap_counts.get(store_id, 0)
                 
-                if api_store_ids:
-                    selected_cost = sum(len(gaps_by_store.get(sid, [])) * 12.50 for sid in api_store_ids)
-                    if st.button(f"💳 Confirm API Fetch for Selected (${selected_cost:,.2f})", use_container_width=True):
-                        fetch_api_data(api_store_ids, gaps_by_store, from_date, to_date)
-                        st.session_state.step = 9
-                        st.rerun()
+                if missing_days > 0:
+                    if st.checkbox(
+                        f"{store_name} - {missing_days} missing days (${gap_costs[store_id]:,.2f})",
+                        key=f"api_select_{store_id}"
+                    ):
+                        api_store_ids.append(store_id)
             
-            else:  # No API fetch
-                if st.button("✅ Continue with Database Data Only", use_container_width=True):
-                    st.session_state.api_records = []
+            if api_store_ids:
+                selected_cost = sum(gap_costs[sid] for sid in api_store_ids)
+                if st.button(f"💳 Confirm API Fetch for Selected (${selected_cost:,.2f})", use_container_width=True):
+                    fetch_api_data(api_store_ids, gaps_by_store, from_date, to_date)
                     st.session_state.step = 9
                     st.rerun()
         
-        else:
-            st.success("✓ No data gaps found! All data available in database.")
-            if st.button("✅ Continue", use_container_width=True):
+        else:  # No API fetch
+            if st.button("✅ Continue with Database Data Only", use_container_width=True):
                 st.session_state.api_records = []
                 st.session_state.step = 9
                 st.rerun()
+    
+    else:
+        st.success("✓ No data gaps found! All data available in database.")
+        if st.button("✅ Continue", use_container_width=True):
+            st.session_state.api_records = []
+            st.session_state.step = 9
+            st.rerun()
+
+
+def group_consecutive_dates(dates: List[date]) -> List[tuple]:
+    """Collapse a sorted list of dates into (start, end) ranges of consecutive days."""
+    if not dates:
+        return []
+    
+    # A range ends wherever the gap to the next ordinal is not exactly one day
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    breaks = np.flatnonzero(np.diff(ordinals) != 1)
+    starts = ordinals[np.concatenate(([0], breaks + 1))]
+    ends = ordinals[np.concatenate((breaks, [len(ordinals) - 1]))]
+    
+    return [(date.fromordinal(int(s)), date.fromordinal(int(e))) for s, e in zip(starts, ends)]
 
 
 def fetch_api_data(store_ids: List[int], gaps_by_store: Dict, from_date: date, to_date: date):
     """Fetch missing data from API for specified stores."""
     api = get_api_client()
-    api_records = []
     
     # Build store info map
     api_store_info = {}
@@ -681,44 +801,59 @@ def fetch_api_data(store_ids: List[int], gaps_by_store: Dict, from_date: date, t
             'distance': store.get('distance', '')
         }
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    total_stores = len(store_ids)
-    
-    for idx, store_id in enumerate(store_ids):
+    # Flatten stores and their contiguous gap ranges into independent API calls
+    work_items = []
+    for store_id in store_ids:
         missing_dates = gaps_by_store.get(store_id, [])
         if not missing_dates:
             continue
         
-        store_name = st.session_state.name_mapping.get(store_id, f"Store {store_id}")
-        status_text.text(f"Fetching data for {store_name}... ({idx+1}/{total_stores})")
-        
-        # Group consecutive dates into ranges
-        ranges = []
-        start = missing_dates[0]
-        end = missing_dates[0]
-        for d in missing_dates[1:]:
-            if (d - end).days == 1:
-                end = d
-            else:
-                ranges.append((start, end))
-                start = end = d
-        ranges.append((start, end))
-        
-        # Fetch each range
-        for range_start, range_end in ranges:
-            api_data = api.fetch_historical_data(
+        for range_start, range_end in group_consecutive_dates(missing_dates):
+            work_items.append((store_id, range_start, range_end))
+    
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    total_requests = len(work_items)
+    parsed_by_item = [None] * total_requests
+    
+    status_text.text(f"Fetching {total_requests} date range(s) for {len(store_ids)} store(s)...")
+    
+    # The API is network-bound, so requests can overlap; keep the pool small to respect rate limits.
+    # Workers share the cached client, so more than one worker is opt-in (STORTRACK_API_WORKERS).
+    executor = ThreadPoolExecutor(max_workers=get_api_worker_count())
+    try:
+        futures = {
+            executor.submit(
+                api.fetch_historical_data,
                 store_id,
                 range_start.strftime('%Y-%m-%d'),
                 range_end.strftime('%Y-%m-%d')
-            )
+            ): idx
+            for idx, (store_id, range_start, range_end) in enumerate(work_items)
+        }
+        
+        # Streamlit calls stay on the script thread; workers only perform HTTP requests
+        for completed, future in enumerate(as_completed(futures), 1):
+            idx = futures[future]
+            store_id = work_items[idx][0]
+            api_data = future.result()
             
             if api_data:
-                parsed_records = parse_api_rate_data(api_data, api_store_info)
-                api_records.extend(parsed_records)
-        
-        progress_bar.progress((idx + 1) / total_stores)
+                parsed_by_item[idx] = parse_api_rate_data(api_data, api_store_info)
+            
+            store_name = st.session_state.name_mapping.get(store_id, f"Store {store_id}")
+            status_text.text(f"Fetched data for {store_name}... ({completed}/{total_requests})")
+            progress_bar.progress(completed / total_requests)
+    except BaseException:
+        # Stop at the first failure like the sequential loop did: queued (billed) calls are
+        # cancelled, only requests already in flight finish
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    
+    # Flatten once, in store/date-range order regardless of completion order
+    api_records = list(chain.from_iterable(filter(None, parsed_by_item)))
     
     status_text.text(f"✓ API fetch complete: {len(api_records)} records retrieved")
     st.session_state.api_records = api_records
@@ -743,54 +878,48 @@ def step9_feature_codes():
     # Filter to Unit type only
     all_records = filter_unit_type(all_records, "Unit")
     
-    # Apply name mapping
-    for record in all_records:
-        store_id = record.get('store_id')
-        if store_id in st.session_state.name_mapping:
-            record['store_name'] = st.session_state.name_mapping[store_id]
+    # Apply name mapping (one dict lookup per record, no session state access in the loop)
+    name_mapping = st.session_state.name_mapping
+    if name_mapping:
+        for record in all_records:
+            custom_name = name_mapping.get(record.get('store_id'))
+            if custom_name is not None:
+                record['store_name'] = custom_name
     
     st.session_state.all_records = all_records
     
     st.markdown("### Unit Size & Feature Codes")
     st.info("💡 Assign feature codes like 'CC' (Climate Controlled), 'DU' (Drive Up), etc. to each unit size")
     
-    # Get unique size/feature combinations
-    unique_combos = {}
-    for record in all_records:
-        size = record.get('size', 'Unknown')
-        cc = record.get('climate_controlled', False)
-        du = record.get('drive_up', False)
-        
-        key = (size, cc, du)
-        if key not in unique_combos:
-            unique_combos[key] = {
-                'size': size,
-                'cc': cc,
-                'du': du,
-                'suggested': []
-            }
-            
-            # Auto-suggest codes
-            if cc:
-                unique_combos[key]['suggested'].append('CC')
-            if du:
-                unique_combos[key]['suggested'].append('DU')
+    # Get unique size/feature combinations (first-seen order)
+    feature_cols = ['size', 'climate_controlled', 'drive_up']
+    # Defaults apply only to absent keys; a stored None stays its own combination
+    records_df = pd.DataFrame(
+        [
+            (record.get('size', 'Unknown'), record.get('climate_controlled', False), record.get('drive_up', False))
+            for record in all_records
+        ],
+        columns=feature_cols
+    )
+    unique_combos = records_df.drop_duplicates()
+    # Inverse index: the position in unique_combos of each record's combination
+    combo_ids = records_df.groupby(feature_cols, sort=False, dropna=False).ngroup().to_numpy()
     
-    feature_mapping = {}
+    feature_codes = []
     
     st.markdown("#### Assign Codes")
-    for idx, (key, info) in enumerate(unique_combos.items()):
-        size = info['size']
-        suggested = '-'.join(info['suggested']) if info['suggested'] else ''
+    for idx, (size, cc, du) in enumerate(unique_combos.itertuples(index=False, name=None)):
+        # Auto-suggest codes
+        suggested = '-'.join(code for code, flag in (('CC', cc), ('DU', du)) if flag)
         
         col1, col2, col3, col4 = st.columns([2, 1, 1, 2])
         
         with col1:
             st.text(f"Size: {size}")
         with col2:
-            st.text(f"CC: {'✓' if info['cc'] else '✗'}")
+            st.text(f"CC: {'✓' if cc else '✗'}")
         with col3:
-            st.text(f"DU: {'✓' if info['du'] else '✗'}")
+            st.text(f"DU: {'✓' if du else '✗'}")
         with col4:
             code = st.text_input(
                 "Feature Code",
@@ -799,22 +928,94 @@ def step9_feature_codes():
                 placeholder="CC-DU",
                 help="Enter feature codes separated by hyphens"
             )
-            feature_mapping[key] = code
+            feature_codes.append(code)
     
     if st.button("✅ Continue", use_container_width=True):
-        # Apply feature codes to records
-        for record in all_records:
-            size = record.get('size', 'Unknown')
-            cc = record.get('climate_controlled', False)
-            du = record.get('drive_up', False)
-            key = (size, cc, du)
-            record['feature_code'] = feature_mapping.get(key, '')
+        # Apply feature codes to records with a single gather through the inverse index
+        record_codes = np.array(feature_codes, dtype=object)[combo_ids]
+        for record, code in zip(all_records, record_codes):
+            record['feature_code'] = code
         
         st.session_state.final_records = all_records
+        # New records invalidate any previously built exports
+        st.session_state.output_csv1 = None
+        st.session_state.output_csv2 = None
+        st.session_state.record_counts = {
+            'total': len(all_records),
+            'stores': len(st.session_state.selected_stores),
+            'db': len(all_records) - len(st.session_state.api_records),
+            'api': len(st.session_state.api_records),
+        }
         st.session_state.step = 10
         st.rerun()
 
 
+def compress_large_download(csv_bytes: bytes) -> tuple:
+    """Return (data, gzipped) for a CSV download, gzipping it above the size threshold."""
+    if len(csv_bytes) <= GZIP_DOWNLOAD_THRESHOLD_BYTES:
+        return csv_bytes, False
+    
+    # Level 1 is far faster than the default and still shrinks repetitive rate data several-fold
+    return gzip.compress(csv_bytes, compresslevel=1), True
+
+
+def build_csv1(records: List[Dict]) -> tuple:
+    """Build the CSV #1 preview DataFrame and the full CSV download (see compress_large_download)."""
+    # Prepare CSV1 data column by column
+    csv1_data = {
+        header: [record.get(field, default) for record in records]
+        for header, field, default in CSV1_COLUMNS
+    }
+    
+    df1 = pd.DataFrame(csv1_data, copy=False)
+    
+    # Serialize straight to UTF-8 bytes
+    csv1_buffer = BytesIO()
+    df1.to_csv(csv1_buffer, index=False, encoding='utf-8')
+    
+    df1_preview = df1.head(CSV1_PREVIEW_ROWS).copy()
+    # Typed columns keep the grid off the object-dtype path and make it sort numerically
+    for header in CSV1_NUMERIC_COLUMNS:
+        # Only type columns of numbers and blanks; text such as 'N/A' is shown as exported
+        column = df1_preview[header]
+        is_number = column.map(
+            lambda value: pd.api.types.is_number(value) and not isinstance(value, (bool, np.bool_))
+        )
+        if (is_number | column.isna() | column.eq('')).all():
+            df1_preview[header] = pd.to_numeric(column.where(is_number))
+    for header in CSV1_BOOLEAN_COLUMNS:
+        # Only type genuine bools (blanks become <NA>); other values are shown as exported
+        column = df1_preview[header]
+        is_bool = column.map(lambda value: isinstance(value, (bool, np.bool_)))
+        if (is_bool | column.isna()).all():
+            df1_preview[header] = column.where(is_bool).astype('boolean')
+    
+    return df1_preview, compress_large_download(csv1_buffer.getvalue())
+
+
+def build_csv2(records: List[Dict], selected_stores: List[Dict], rankings: Dict,
+               adjustment_factors: Dict) -> tuple:
+    """Generate the CSV #2 summary report and return its DataFrame and CSV bytes."""
+    # generate_csv2_report only writes to a path, so give it a scratch file and read it back once
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv2_path = os.path.join(tmp_dir, 'summary.csv')
+        generate_csv2_report(
+            records,
+            selected_stores,
+            rankings,
+            adjustment_factors,
+            csv2_path
+        )
+        
+        with open(csv2_path, 'rb') as f:
+            csv2_bytes = f.read()
+    
+    # Display from the same bytes that are downloaded
+    df2 = pd.read_csv(BytesIO(csv2_bytes))
+    
+    return df2, csv2_bytes
+
+
 def step10_export_results():
     """Step 10: Export and display results."""
     render_step_header(
@@ -823,82 +1024,67 @@ def step10_export_results():
         "View and download your rate analysis results"
     )
     
-    if not st.session_state.final_records:
+    final_records = st.session_state.final_records
+    
+    if not final_records:
         st.error("No data available for export")
         return
     
+    selected_stores = st.session_state.selected_stores
+    rankings = st.session_state.rankings
+    adjustment_factors = st.session_state.adjustment_factors
+    
     # Generate output filenames
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     city_slug = st.session_state.search_params.get('city', 'unknown').replace(' ', '_').lower()
     output_file_csv1 = f"RCA_{city_slug}_{timestamp}_data.csv"
     output_file_csv2 = f"RCA_{city_slug}_{timestamp}_summary.csv"
     
-    # Create DataFrames
+    # Build both outputs once per set of final records; reruns reuse them
+    if st.session_state.output_csv1 is None:
+        st.session_state.output_csv1 = build_csv1(final_records)
+    df1_preview, (csv1_data, csv1_gzipped) = st.session_state.output_csv1
+    
+    if st.session_state.output_csv2 is None:
+        st.session_state.output_csv2 = build_csv2(
+            final_records,
+            selected_stores,
+            rankings,
+            adjustment_factors
+        )
+    df2, csv2_bytes = st.session_state.output_csv2
+    
+    # Display CSV1
     st.markdown("### 📊 CSV #1: Full Data Dump")
     
-    # Prepare CSV1 data
-    csv1_data = []
-    for record in st.session_state.final_records:
-        csv1_data.append({
-            'Store Name': record.get('store_name', ''),
-            'Store ID': record.get('store_id', ''),
-            'Address': record.get('address', ''),
-            'City': record.get('city', ''),
-            'State': record.get('state', ''),
-            'ZIP': record.get('zip', ''),
-            'Distance (mi)': record.get('distance', ''),
-            'Size': record.get('size', ''),
-            'Feature Code': record.get('feature_code', ''),
-            'Regular Rate': record.get('regular_rate', ''),
-            'Online Rate': record.get('online_rate', ''),
-            'Date Collected': record.get('date_collected', ''),
-            'Climate Controlled': record.get('climate_controlled', False),
-            'Drive Up': record.get('drive_up', False),
-            'Promo': record.get('promo', ''),
-        })
-    
-    df1 = pd.DataFrame(csv1_data)
-    
-    # Display with pagination
-    st.dataframe(df1, use_container_width=True, height=400)
+    # Only a preview goes over the websocket; the download below has every row
+    st.dataframe(df1_preview, use_container_width=True, height=400)
+    total_records = len(final_records)
+    if total_records > CSV1_PREVIEW_ROWS:
+        st.caption(f"Showing the first {CSV1_PREVIEW_ROWS:,} of {total_records:,} records. Download CSV #1 for the full data.")
     
     # Download button for CSV1
-    csv1_buffer = StringIO()
-    df1.to_csv(csv1_buffer, index=False)
+    if csv1_gzipped:
+        st.caption("CSV #1 is large, so it downloads gzip-compressed (.csv.gz).")
     st.download_button(
         label="📥 Download CSV #1 (Full Data)",
-        data=csv1_buffer.getvalue(),
-        file_name=output_file_csv1,
-        mime="text/csv",
+        data=csv1_data,
+        file_name=f"{output_file_csv1}.gz" if csv1_gzipped else output_file_csv1,
+        mime="application/gzip" if csv1_gzipped else "text/csv",
         use_container_width=True
     )
     
     st.divider()
     
-    # Generate CSV2
+    # Display CSV2
     st.markdown("### 📈 CSV #2: Summary with Adjustments")
     
-    # Create CSV2 using the existing function
-    csv2_path = output_file_csv2
-    generate_csv2_report(
-        st.session_state.final_records,
-        st.session_state.selected_stores,
-        st.session_state.rankings,
-        st.session_state.adjustment_factors,
-        csv2_path
-    )
-    
-    # Read and display CSV2
-    df2 = pd.read_csv(csv2_path)
     st.dataframe(df2, use_container_width=True, height=400)
     
     # Download button for CSV2
-    with open(csv2_path, 'r') as f:
-        csv2_content = f.read()
-    
     st.download_button(
         label="📥 Download CSV #2 (Summary Report)",
-        data=csv2_content,
+        data=csv2_bytes,
         file_name=output_file_csv2,
         mime="text/csv",
         use_container_width=True
@@ -908,17 +1094,27 @@ def step10_export_results():
     st.divider()
     st.markdown("### 📊 Analysis Summary")
     
+    # Step 9 records the counts; compute them here if the records were committed without them
+    if st.session_state.record_counts is None:
+        api_count = len(st.session_state.api_records)
+        st.session_state.record_counts = {
+            'total': len(final_records),
+            'stores': len(selected_stores),
+            'db': len(final_records) - api_count,
+            'api': api_count,
+        }
+    record_counts = st.session_state.record_counts
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Records", len(st.session_state.final_records))
+        st.metric("Total Records", record_counts['total'])
     with col2:
-        st.metric("Stores Analyzed", len(st.session_state.selected_stores))
+        st.metric("Stores Analyzed", record_counts['stores'])
     with col3:
-        db_count = len(st.session_state.all_records) - len(st.session_state.api_records)
-        st.metric("DB Records", db_count)
+        st.metric("DB Records", record_counts['db'])
     with col4:
-        st.metric("API Records", len(st.session_state.api_records))
+        st.metric("API Records", record_counts['api'])
     
     # Reset button
     if st.button("🔄 Start New Analysis", use_container_width=True):
@@ -927,6 +1123,49 @@ def step10_export_results():
         st.rerun()
 
 
+# Sidebar labels and page functions for steps 1-10, in order
+STEP_LABELS = (
+    "1️⃣ Find Subject Store",
+    "2️⃣ Find Competitors",
+    "3️⃣ Select Stores",
+    "4️⃣ Store Metadata",
+    "5️⃣ Store Rankings",
+    "6️⃣ Adjustment Factors",
+    "7️⃣ Custom Names",
+    "8️⃣ Fetch Data",
+    "9️⃣ Feature Codes",
+    "🏁 Export Results",
+)
+
+STEP_FUNCTIONS = (
+    step1_search_subject_store,
+    step2_find_competitors,
+    step3_select_stores,
+    step4_store_metadata,
+    step5_store_rankings,
+    step6_adjustment_factors,
+    step7_custom_names,
+    step8_fetch_data,
+    step9_feature_codes,
+    step10_export_results,
+)
+
+
+@lru_cache(maxsize=None)
+def build_step_navigation(steps: tuple, current_step: int) -> str:
+    """Build the sidebar step list as a single markdown block."""
+    lines = []
+    for i, step in enumerate(steps, 1):
+        if i == current_step:
+            lines.append(f"**➡️ {step}**")
+        elif i < current_step:
+            lines.append(f"✅ {step}")
+        else:
+            lines.append(f"⚪ {step}")
+    
+    return "\n\n".join(lines)
+
+
 def main():
     """Main application logic."""
     
@@ -939,26 +1178,7 @@ def main():
         st.markdown("## Navigation")
         st.markdown("---")
         
-        steps = [
-            "1️⃣ Find Subject Store",
-            "2️⃣ Find Competitors",
-            "3️⃣ Select Stores",
-            "4️⃣ Store Metadata",
-            "5️⃣ Store Rankings",
-            "6️⃣ Adjustment Factors",
-            "7️⃣ Custom Names",
-            "8️⃣ Fetch Data",
-            "9️⃣ Feature Codes",
-            "🏁 Export Results"
-        ]
-        
-        for i, step in enumerate(steps, 1):
-            if i == st.session_state.step:
-                st.markdown(f"**➡️ {step}**")
-            elif i < st.session_state.step:
-                st.markdown(f"✅ {step}")
-            else:
-                st.markdown(f"⚪ {step}")
+        st.markdown(build_step_navigation(STEP_LABELS, st.session_state.step))
         
         st.markdown("---")
         
@@ -967,26 +1187,13 @@ def main():
             st.json({
                 'step': st.session_state.step,
                 'selected_stores': len(st.session_state.selected_stores),
-                'final_records': len(st.session_state.final_records) if st.session_state.final_records else 0
+                'final_records': len(st.session_state.final_records or ())
             })
     
     # Main content - route to appropriate step
-    step_functions = {
-        1: step1_search_subject_store,
-        2: step2_find_competitors,
-        3: step3_select_stores,
-        4: step4_store_metadata,
-        5: step5_store_rankings,
-        6: step6_adjustment_factors,
-        7: step7_custom_names,
-        8: step8_fetch_data,
-        9: step9_feature_codes,
-        10: step10_export_results,
-    }
-    
     current_step = st.session_state.step
-    if current_step in step_functions:
-        step_functions[current_step]()
+    if 1 <= current_step <= len(STEP_FUNCTIONS):
+        STEP_FUNCTIONS[current_step - 1]()
     else:
         st.error(f"Invalid step: {current_step}")
 